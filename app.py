@@ -1,8 +1,214 @@
 import io
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import altair as alt
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; pandas cumsum covers small plans
+    njit = None
+
+# Below this row count the pandas groupby cumsum is cheaper than a JIT call.
+_NUMBA_MIN_ROWS = 10_000
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _group_cumsum(codes, values, out):
+        acc = np.zeros(codes.max() + 1)
+        for i in range(len(codes)):
+            acc[codes[i]] += values[i]
+            out[i] = acc[codes[i]]
+
+
+@st.cache_data
+def _load_default_df() -> pd.DataFrame:
+    return pd.DataFrame(_DEFAULT_DATA)
+
+
+@st.cache_data
+def _load_uploaded_df(csv_bytes: bytes) -> pd.DataFrame:
+    # The schema is fixed, so skip type inference and let pyarrow parse the
+    # file into Arrow-backed columns directly.
+    return pd.read_csv(
+        io.BytesIO(csv_bytes),
+        engine="pyarrow",
+        dtype_backend="pyarrow",
+        dtype={
+            "year": "int32[pyarrow]",
+            "component_type": "string[pyarrow]",
+            "component_subtype": "string[pyarrow]",
+            "unit_count": "int32[pyarrow]",
+        },
+    )
+
+
+# Carbon multipliers (tons CO₂ per unit)
+co2_factors = {
+    ("cable", "underground"): 3.12,
+    ("cable", "overhead"): 2.08,
+    ("transformer", "step-up"): 2.5,
+    ("transformer", "step-down"): 1.5,
+    ("substation", "unspecified"): 5,
+}
+
+# Canonical component labels, in factor-table order, so category codes and
+# color assignment stay stable regardless of row order in the plan.
+component_categories = [
+    ct if sub == "unspecified" else f"{sub} {ct}" for ct, sub in co2_factors
+]
+
+impact_category_units = {
+    "Climate Change": "kg CO₂-eq",
+    "Acidification": "mol H⁺-eq",
+    "Ecotoxicity: Freshwater": "CTUe",
+    "Energy Resources: Non-Renewable": "MJ",
+    "Eutrophication: Freshwater": "kg P-eq",
+    "Eutrophication: Marine": "kg N-eq",
+    "Eutrophication: Terrestrial": "mol N-eq",
+    "Human Toxicity: Carcinogenic": "CTUh",
+    "Human Toxicity: Non-Carcinogenic": "CTUh",
+    "Ionising Radiation: Human Health": "kBq U235-eq",
+    "Land Use": "-",
+    "Material Resources: Metals/Minerals": "kg Sb-eq",
+    "Ozone Depletion": "kg CFC-11-eq",
+    "Particulate Matter Formation": "[-]",
+    "Photochemical Oxidant Formation: Human Health": "kg NMVOC-eq",
+    "Water Use": "m³"
+}
+
+default_colors = [
+    "#00549F",
+    "#F6A800",
+    "#57AB27",
+    "#CC071E",
+    "#7A6FAC",
+    "#0098A1",
+    "#BDCD00",
+    "#006165",
+]
+
+# Dummy data as default input, column-wise so no CSV parsing is needed
+_DEFAULT_DATA = {
+    "year": [
+        2020, 2020, 2020, 2020, 2020,
+        2025, 2025, 2025, 2025, 2025,
+        2030, 2030, 2030, 2030, 2030,
+        2035, 2035, 2035, 2035, 2035,
+        2040, 2040, 2040, 2040, 2040,
+    ],
+    "component_type": [
+        "cable", "cable", "transformer", "transformer", "substation",
+    ] * 5,
+    "component_subtype": [
+        "underground", "overhead", "step-up", "step-down", None,
+    ] * 5,
+    "unit_count": [
+        65, 50, 30, 25, 23,
+        35, 40, 12, 6, 4,
+        21, 50, 14, 7, 5,
+        20, 60, 8, 8, 6,
+        28, 70, 12, 9, 7,
+    ],
+}
+
+
+@st.cache_data
+def compute_impacts(df: pd.DataFrame, scenario: str) -> pd.DataFrame:
+    """Return the plan with `component` and `CO2` columns added.
+
+    Cached on the dataframe contents and the scenario, so reruns that only
+    touch chart controls skip the whole computation.
+    """
+    df = df.copy()
+    # Fill missing subtypes at the category level (O(categories), not O(n));
+    # an empty string stands in for "no subtype" so labels need no strip pass.
+    if "component_subtype" in df.columns:
+        df["component_subtype"] = (
+            df["component_subtype"].astype("category").cat.add_categories([""]).fillna("")
+        )
+    else:
+        df["component_subtype"] = pd.Categorical([""] * len(df))
+    df["component"] = np.where(
+        df["component_subtype"].eq(""),
+        df["component_type"],
+        df["component_subtype"].astype(str) + " " + df["component_type"].astype(str),
+    )
+    # These columns hold a handful of distinct strings; categoricals let the
+    # downstream groupbys run on integer codes instead of hashing objects.
+    for c in ("component_type", "component_subtype"):
+        df[c] = df[c].astype("category")
+    # Pin component to the canonical codebook; labels outside the factor
+    # table (user-defined rows) are appended after it. Blank editor rows
+    # yield a null label, which must not end up in the categories.
+    extra = [
+        c
+        for c in pd.unique(df["component"].dropna())
+        if c not in component_categories
+    ]
+    df["component"] = pd.Categorical(
+        df["component"], categories=component_categories + extra
+    )
+    # Encode the factor table as a (type, subtype) lookup array aligned with
+    # the category codes, so the CO2 column is one fancy-index and multiply.
+    type_cats = df["component_type"].cat.categories
+    subtype_cats = df["component_subtype"].cat.categories
+    lut = np.zeros((len(type_cats), len(subtype_cats)))
+    for (ct, sub), factor in co2_factors.items():
+        # co2_factors keeps the user-facing "unspecified" key; the column
+        # stores missing subtypes as "", but data may also carry a literal
+        # "unspecified" (e.g. a CSV exported from an older version), so the
+        # factor goes into both slots.
+        subs = (sub, "") if sub == "unspecified" else (sub,)
+        for s in subs:
+            if ct in type_cats and s in subtype_cats:
+                lut[type_cats.get_loc(ct), subtype_cats.get_loc(s)] = factor
+    ct_codes = df["component_type"].cat.codes.to_numpy()
+    sub_codes = df["component_subtype"].cat.codes.to_numpy()
+    # Null entries carry code -1; mask them out so they can't wrap-index
+    # into the last row of the lookup table.
+    valid = (ct_codes >= 0) & (sub_codes >= 0)
+    row_factors = np.zeros(len(df))
+    row_factors[valid] = lut[ct_codes[valid], sub_codes[valid]]
+    df["CO2"] = row_factors * df["unit_count"].to_numpy()
+    return df
+
+
+@st.cache_data
+def group_sum(df: pd.DataFrame, group: str) -> pd.DataFrame:
+    """Sum CO2 per (year, component), optionally filtered to one type.
+
+    Cached so toggling chart controls that don't change the selection
+    (e.g. Cumulative) reuses the grouped frame.
+    """
+    if isinstance(df["year"].dtype, pd.ArrowDtype):
+        # Uploaded plans are Arrow-backed; aggregate natively in Arrow
+        # instead of going through pandas groupby dispatch.
+        table = pa.Table.from_pandas(df)
+        if group != "All":
+            table = table.filter(pc.equal(table["component_type"], group))
+        out = table.group_by(["year", "component"]).aggregate([("CO2", "sum")])
+        # Select by name before renaming; aggregate output column order is
+        # not part of the pyarrow API contract.
+        out = out.select(["year", "component", "CO2_sum"])
+        return out.rename_columns(["year", "component", "CO2"]).to_pandas()
+    sub = df if group == "All" else df[df["component_type"] == group]
+    return sub.groupby(["year", "component"], as_index=False, observed=True)[
+        "CO2"
+    ].sum()
+
+
+@st.cache_data
+def make_color_map(components: tuple[str, ...]) -> dict[str, str]:
+    return {
+        comp: default_colors[i % len(default_colors)]
+        for i, comp in enumerate(components)
+    }
+
+
 st.title("Grid Expansion Impact Calculator")
 st.markdown(
     """
@@ -16,43 +222,13 @@ if "calculated_df" not in st.session_state:
 
 with st.container(border=True):
     st.markdown("### Expansion Plan Definition")
-    
-    # Dummy CSV data as default input
-    dummy_csv = """
-    year,component_type,component_subtype,unit_count
-    2020,cable,underground,65
-    2020,cable,overhead,50
-    2020,transformer,step-up,30
-    2020,transformer,step-down,25
-    2020,substation,,23
-    2025,cable,underground,35
-    2025,cable,overhead,40
-    2025,transformer,step-up,12
-    2025,transformer,step-down,6
-    2025,substation,,4
-    2030,cable,underground,21
-    2030,cable,overhead,50
-    2030,transformer,step-up,14
-    2030,transformer,step-down,7
-    2030,substation,,5
-    2035,cable,underground,20
-    2035,cable,overhead,60
-    2035,transformer,step-up,8
-    2035,transformer,step-down,8
-    2035,substation,,6
-    2040,cable,underground,28
-    2040,cable,overhead,70
-    2040,transformer,step-up,12
-    2040,transformer,step-down,9
-    2040,substation,,7
-    """
 
     # Create tabs for manual input and CSV upload
     tab1, tab2 = st.tabs(["Manual Input", "CSV Upload"])
 
     with tab1:
         df = st.data_editor(
-            pd.read_csv(io.StringIO(dummy_csv.strip())),
+            _load_default_df(),
             num_rows="dynamic",
             use_container_width=True,
         )
@@ -60,30 +236,11 @@ with st.container(border=True):
     with tab2:
         uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
         if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file)
+            df = _load_uploaded_df(uploaded_file.getvalue())
             st.write("Data preview:", df.head())
 
     st.markdown("### Calculation Setup")
-    
-    impact_category_units = {
-        "Climate Change": "kg CO₂-eq",
-        "Acidification": "mol H⁺-eq",
-        "Ecotoxicity: Freshwater": "CTUe",
-        "Energy Resources: Non-Renewable": "MJ",
-        "Eutrophication: Freshwater": "kg P-eq",
-        "Eutrophication: Marine": "kg N-eq",
-        "Eutrophication: Terrestrial": "mol N-eq",
-        "Human Toxicity: Carcinogenic": "CTUh",
-        "Human Toxicity: Non-Carcinogenic": "CTUh",
-        "Ionising Radiation: Human Health": "kBq U235-eq",
-        "Land Use": "-",
-        "Material Resources: Metals/Minerals": "kg Sb-eq",
-        "Ozone Depletion": "kg CFC-11-eq",
-        "Particulate Matter Formation": "[-]",
-        "Photochemical Oxidant Formation: Human Health": "kg NMVOC-eq",
-        "Water Use": "m³"
-    }
-    
+
     setup_col1, setup_col2 = st.columns([1, 1])
     with setup_col1:
         impact_category = st.selectbox(
@@ -97,69 +254,44 @@ with st.container(border=True):
         )
     
     calculated_df = st.session_state.calculated_df
-    # Define carbon multipliers (tons CO₂ per unit)
-    co2_factors = {
-        ("cable", "underground"): 3.12,
-        ("cable", "overhead"): 2.08,
-        ("transformer", "step-up"): 2.5,
-        ("transformer", "step-down"): 1.5,
-        ("substation", "unspecified"): 5,
-    }
-    if "component_subtype" in df.columns:
-        df["component_subtype"] = df["component_subtype"].fillna("unspecified")
-    else:
-        df["component_subtype"] = "unspecified"
-        
-    df["component"] = df["component_subtype"] + " " + df["component_type"]
     if st.button("Calculate Impact", type="primary", use_container_width=True):
         st.toast("Calculating impacts...", icon="🧮")
-        df["CO2"] = df.apply(
-            lambda row: row["unit_count"]
-            * co2_factors.get((row["component_type"], row["component_subtype"]), 0),
-            axis=1,
-        )
-        df["component"] = df["component_subtype"] + " " + df["component_type"]
-        df["component"] = df["component"].str.strip()
-        st.session_state.calculated_df = df
-        calculated_df = df
+        calculated_df = compute_impacts(df, scenario)
+        st.session_state.calculated_df = calculated_df
         st.toast("Calculation complete!", icon="✅")
             
 if calculated_df is not None:
     with st.container(border=True):
         st.markdown("### Results")
-        
-        default_colors = [
-            "#00549F",
-            "#F6A800",
-            "#57AB27",
-            "#CC071E",
-            "#7A6FAC",
-            "#0098A1",
-            "#BDCD00",
-            "#006165",
-        ]
-
-        components = df["component"].unique().tolist()
-        color_map = {
-            comp: default_colors[i % len(default_colors)] for i, comp in enumerate(components)
-        }
+
+        components = list(calculated_df["component"].cat.categories)
+        color_map = make_color_map(tuple(components))
         all_groups = calculated_df["component_type"].unique().tolist()
         selected_group = st.segmented_control(
             "Filter by component group", options=["All"] + all_groups, default="All"
         )
         cumulative = st.checkbox("Cumulative", key="cumulative_all")
-        df_filtered = (
-            calculated_df if selected_group == "All" else calculated_df[calculated_df["component_type"] == selected_group]
-        )
-        df_grouped = df_filtered.groupby(["year", "component"], as_index=False)["CO2"].sum()
-        df_pivot = df_grouped.pivot(index="year", columns="component", values="CO2").fillna(
-            0
-        )
+        df_long = group_sum(calculated_df, selected_group)
         if cumulative:
-            df_pivot = df_pivot.cumsum()
-        df_long = df_pivot.reset_index().melt(
-            id_vars="year", var_name="component", value_name="CO2"
-        )
+            # Zero-fill missing (year, component) pairs so each component's
+            # running total carries through years without new additions, then
+            # cumsum per component directly on the long frame.
+            grid = pd.MultiIndex.from_product(
+                [df_long["year"].unique(), df_long["component"].unique()],
+                names=["year", "component"],
+            ).to_frame(index=False)
+            df_long = grid.merge(df_long, how="left").fillna({"CO2": 0})
+            df_long = df_long.sort_values(["component", "year"])
+            if njit is not None and len(df_long) >= _NUMBA_MIN_ROWS:
+                codes = pd.Categorical(df_long["component"]).codes.astype(np.int64)
+                values = df_long["CO2"].to_numpy(dtype=np.float64)
+                out = np.empty(len(values))
+                _group_cumsum(codes, values, out)
+                df_long["CO2"] = out
+            else:
+                df_long["CO2"] = df_long.groupby("component", observed=True)[
+                    "CO2"
+                ].cumsum()
         chart = (
             alt.Chart(df_long)
             .mark_bar()